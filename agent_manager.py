@@ -1,11 +1,16 @@
-from typing import Dict
+from collections import OrderedDict
+from typing import Any, Dict, List
 from living_agent import LivingAgent
+from task_versions import task_versions
 from datetime import datetime, timedelta
 from config import AGENT_CONFIG
 
 class AgentManager:
     def __init__(self):
         self.active_agents: Dict[str, LivingAgent] = {}
+        # Chat history of evicted agents, so a returning user only needs the
+        # messages written since the agent was shut down.
+        self.history_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
     
     def _get_agent_key(self, user_id: str, agent_id: str) -> str:
         return f"{user_id}:{agent_id}"
@@ -15,7 +20,7 @@ class AgentManager:
         
         if key not in self.active_agents:
             agent = LivingAgent(user_id, agent_id)
-            await agent.initialize()
+            await agent.initialize(history=self.history_cache.pop(key, None))
             self.active_agents[key] = agent
         else:
             self.active_agents[key].last_activity = datetime.now()
@@ -26,8 +31,7 @@ class AgentManager:
         key = self._get_agent_key(user_id, agent_id)
         
         if key in self.active_agents:
-            await self.active_agents[key].shutdown()
-            del self.active_agents[key]
+            await self._evict(key)
     
     async def cleanup_idle_agents(self):
         idle_threshold = datetime.now() - timedelta(seconds=AGENT_CONFIG["agent_idle_timeout"])
@@ -39,8 +43,20 @@ class AgentManager:
                 keys_to_remove.append(key)
         
         for key in keys_to_remove:
-            await self.active_agents[key].shutdown()
-            del self.active_agents[key]
+            await self._evict(key)
+    
+    async def _evict(self, key: str):
+        agent = self.active_agents.pop(key)
+        
+        self.history_cache[key] = agent.history
+        self.history_cache.move_to_end(key)
+        while len(self.history_cache) > AGENT_CONFIG["history_cache_size"]:
+            self.history_cache.popitem(last=False)
+        
+        await agent.shutdown()
+        # Keeps the version table bounded by the active agents; the key gets a
+        # fresh prefix if the agent comes back.
+        task_versions.forget(agent.user_id, agent.agent_id)
     
     def get_active_agent_count(self) -> int:
         return len(self.active_agents)
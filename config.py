@@ -22,10 +22,14 @@ AGENT_CONFIG = {
     "max_conversation_history": 20,
     "task_check_interval": 5,
     "agent_idle_timeout": 3600,
+    "history_cache_size": 1000,
+    "progress_write_interval": 5,
+    "optimistic_task_ack": False,
 }
 
 SERVER_CONFIG = {
     "host": "0.0.0.0",
     "port": 8000,
     "reload": False,
+    "gzip_minimum_size": 1024,
 }
\ No newline at end of file
@@ -27,6 +27,10 @@ class Database:
         response = self.client.table('tasks').insert(task_data).execute()
         return Task(**response.data[0])
     
+    async def create_tasks(self, tasks_data: List[Dict[str, Any]]) -> List[Task]:
+        response = self.client.table('tasks').insert(tasks_data).execute()
+        return [Task(**task) for task in response.data]
+    
     async def update_task(self, task_id: str, update_data: Dict[str, Any]) -> Task:
         response = self.client.table('tasks').update(update_data).eq('id', task_id).execute()
         return Task(**response.data[0])
@@ -64,8 +68,16 @@ class Database:
         }
         self.client.table('chat_messages').insert(message_data).execute()
     
-    async def get_recent_messages(self, user_id: str, agent_id: str, limit: int = 20) -> List[Dict[str, Any]]:
-        response = self.client.table('chat_messages').select('*').eq('user_id', user_id).eq('agent_id', agent_id).order('created_at', desc=False).limit(limit).execute()
-        return response.data
+    async def get_recent_messages(self, user_id: str, agent_id: str, limit: int = 20, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = self.client.table('chat_messages').select('*').eq('user_id', user_id).eq('agent_id', agent_id)
+        
+        # Keyset on created_at: only rows at or after the last one already seen.
+        # gte rather than gt so rows sharing that timestamp are not lost; the
+        # caller drops the ones it already has by id.
+        if since:
+            query = query.gte('created_at', since)
+        
+        response = query.order('created_at', desc=True).limit(limit).execute()
+        return list(reversed(response.data))
 
 db = Database()
\ No newline at end of file
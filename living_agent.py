@@ -1,10 +1,13 @@
 import asyncio
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+import uuid
+from typing import Dict, List, Optional, Any, Set, Tuple
+from datetime import datetime, timezone
 from models import TaskState, TaskStatus, Message
 from database import db
 from llm_client import llm_client
 from tools import execute_tool, get_available_tools
+from task_versions import task_versions
+from progress import ProgressReporter
 from config import AGENT_CONFIG
 
 class LivingAgent:
@@ -15,22 +18,25 @@ class LivingAgent:
         self.conversation_context: List[Message] = []
         self.active_tasks: Dict[str, asyncio.Task] = {}
         self.task_states: Dict[str, TaskState] = {}
+        # Serialized all_tasks for /api/tasks, keyed by the rows tag it was read at.
+        self.all_tasks_cache: Optional[Tuple[str, List[Dict[str, Any]]]] = None
+        self.history: List[Dict[str, Any]] = []
+        self.resume_task: Optional[asyncio.Task] = None
+        self.closed = False
+        # Strong references to fire-and-forget tasks until they finish.
+        self.background_tasks: Set[asyncio.Task] = set()
         self.last_activity = datetime.now()
     
-    async def initialize(self):
+    async def initialize(self, history: Optional[List[Dict[str, Any]]] = None):
         self.agent_data = await db.get_agent_data(self.agent_id)
         
         network = await db.get_user_agent_network(self.user_id, self.agent_id)
         if not network:
             raise ValueError(f"Agent {self.agent_id} not in user {self.user_id} network")
         
-        recent_messages = await db.get_recent_messages(
-            self.user_id,
-            self.agent_id,
-            limit=AGENT_CONFIG["max_conversation_history"]
-        )
+        self.history = await self._sync_history(history or [])
         
-        for msg in recent_messages:
+        for msg in self.history:
             self.conversation_context.append(
                 Message(
                     role="user" if msg["sender_type"] == "user" else "assistant",
@@ -38,12 +44,38 @@ class LivingAgent:
                 )
             )
         
-        await self._resume_pending_tasks()
+        # Resuming tasks is not needed to answer the first message, so keep it
+        # off the request path.
+        self.resume_task = asyncio.create_task(self._resume_pending_tasks())
+    
+    async def _sync_history(self, history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        limit = AGENT_CONFIG["max_conversation_history"]
+        since = history[-1]["created_at"] if history else None
+        
+        newer = await db.get_recent_messages(
+            self.user_id,
+            self.agent_id,
+            limit=limit,
+            since=since
+        )
+        
+        seen = {msg["id"] for msg in history}
+        history = history + [msg for msg in newer if msg["id"] not in seen]
+        return history[-limit:]
     
     async def _resume_pending_tasks(self):
-        pending_tasks = await db.get_pending_tasks(self.user_id, self.agent_id)
+        try:
+            pending_tasks = await db.get_pending_tasks(self.user_id, self.agent_id)
+        except Exception as e:
+            print(f"Error resuming pending tasks: {e}")
+            return
         
         for task in pending_tasks:
+            # A task created by a message handled while this query was in flight
+            # is still pending in the database but already running here.
+            if task.id in self.active_tasks:
+                continue
+            
             background_task = asyncio.create_task(
                 self._execute_task(task.id, task.tool_name, task.tool_params)
             )
@@ -56,6 +88,9 @@ class LivingAgent:
                 progress=0,
                 created_at=task.created_at
             )
+        
+        if pending_tasks:
+            self._bump_active_version()
     
     async def handle_message(self, message_text: str) -> str:
         self.last_activity = datetime.now()
@@ -122,41 +157,126 @@ Be conversational and helpful. Always be aware of task context when responding."
             )
         return "\n".join(summary)
     
+    def _bump_task_version(self):
+        # Call after the change is written, so a poll that read the old rows
+        # carries the old tag and is refetched next time. Skipped once shut
+        # down, so late callbacks don't recreate the entry AgentManager dropped.
+        if not self.closed:
+            task_versions.bump(self.user_id, self.agent_id)
+    
+    def _bump_active_version(self):
+        # For changes to task_states alone; the cached task rows stay valid.
+        if not self.closed:
+            task_versions.bump_active(self.user_id, self.agent_id)
+    
+    def _build_task_data(self, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        tool_name = tool_call["name"]
+        params = tool_call["arguments"]
+        
+        return {
+            "id": str(uuid.uuid4()),
+            "user_id": self.user_id,
+            "agent_id": self.agent_id,
+            "task_name": f"{tool_name}({', '.join(f'{k}={v}' for k, v in params.items())})",
+            "task_description": f"Execute {tool_name} with parameters {params}",
+            "tool_name": tool_name,
+            "tool_params": params,
+            "status": TaskStatus.PENDING.value,
+            "estimated_duration": 60,
+            "progress": 0
+        }
+    
     async def _handle_tool_calls(self, tool_calls: List[Dict[str, Any]]):
-        for tool_call in tool_calls:
-            tool_name = tool_call["name"]
-            params = tool_call["arguments"]
-            
-            task_name = f"{tool_name}({', '.join(f'{k}={v}' for k, v in params.items())})"
-            
-            task_data = {
-                "user_id": self.user_id,
-                "agent_id": self.agent_id,
-                "task_name": task_name,
-                "task_description": f"Execute {tool_name} with parameters {params}",
-                "tool_name": tool_name,
-                "tool_params": params,
-                "status": TaskStatus.PENDING.value,
-                "estimated_duration": 60,
-                "progress": 0
-            }
-            
-            task = await db.create_task(task_data)
+        tasks_data = [self._build_task_data(tool_call) for tool_call in tool_calls]
+        
+        if AGENT_CONFIG["optimistic_task_ack"]:
+            # Reply before the rows are confirmed; each task waits for the
+            # insert before it runs and is dropped if the insert fails.
+            created = asyncio.create_task(db.create_tasks(tasks_data))
+            created.add_done_callback(lambda done: self._on_tasks_created(done, tasks_data))
+            now = datetime.now(timezone.utc)
+            created_at = {task_data["id"]: now for task_data in tasks_data}
+        else:
+            created = None
+            tasks = await db.create_tasks(tasks_data)
+            created_at = {task.id: task.created_at for task in tasks}
+        
+        for task_data in tasks_data:
+            task_id = task_data["id"]
             
             background_task = asyncio.create_task(
-                self._execute_task(task.id, tool_name, params)
+                self._execute_task(task_id, task_data["tool_name"], task_data["tool_params"], created)
             )
             
-            self.active_tasks[task.id] = background_task
-            self.task_states[task.id] = TaskState(
-                id=task.id,
-                name=task_name,
+            self.active_tasks[task_id] = background_task
+            self.task_states[task_id] = TaskState(
+                id=task_id,
+                name=task_data["task_name"],
                 status=TaskStatus.RUNNING,
                 progress=0,
-                created_at=task.created_at
+                created_at=created_at[task_id]
             )
+        
+        self._bump_task_version()
+    
+    def _on_tasks_created(self, created: asyncio.Task, tasks_data: List[Dict[str, Any]]):
+        if created.cancelled():
+            return
+        
+        # Retrieved here so the failure is handled once for the whole turn,
+        # even if every task waiting on the insert was cancelled first.
+        error = created.exception()
+        if error is None:
+            self._bump_task_version()
+            return
+        
+        # The rows were never written, so there is nothing to mark failed.
+        failed_names = []
+        for task_data in tasks_data:
+            self.active_tasks.pop(task_data["id"], None)
+            if self.task_states.pop(task_data["id"], None):
+                failed_names.append(task_data["task_name"])
+        
+        if failed_names:
+            self._bump_active_version()
+            notify_task = asyncio.create_task(self._notify_tasks_not_started(failed_names, error))
+            self.background_tasks.add(notify_task)
+            notify_task.add_done_callback(self.background_tasks.discard)
     
-    async def _execute_task(self, task_id: str, tool_name: str, params: Dict[str, Any]):
+    async def _notify_tasks_not_started(self, task_names: List[str], error: BaseException):
+        try:
+            await self._notify_user(
+                f"These tasks could not be started: {', '.join(task_names)}. Error: {str(error)}"
+            )
+        except Exception as e:
+            print(f"Error notifying user of failed task creation: {e}")
+    
+    def _set_progress(self, task_id: str, progress: int):
+        if task_id in self.task_states:
+            self.task_states[task_id].progress = progress
+            self._bump_active_version()
+    
+    async def _execute_task(
+        self,
+        task_id: str,
+        tool_name: str,
+        params: Dict[str, Any],
+        created: Optional[asyncio.Task] = None
+    ):
+        if created is not None:
+            try:
+                # Shielded: cancelling one task must not cancel the shared insert.
+                await asyncio.shield(created)
+            except Exception:
+                # Already reconciled for the whole turn by _on_tasks_created.
+                return
+        
+        reporter = ProgressReporter(
+            task_id,
+            lambda progress: self._set_progress(task_id, progress),
+            AGENT_CONFIG["progress_write_interval"]
+        )
+        
         try:
             await db.update_task(task_id, {
                 "status": TaskStatus.RUNNING.value,
@@ -165,8 +285,10 @@ Be conversational and helpful. Always be aware of task context when responding."
             
             if task_id in self.task_states:
                 self.task_states[task_id].status = TaskStatus.RUNNING
+            self._bump_task_version()
             
-            result = await execute_tool(tool_name, params)
+            result = await execute_tool(tool_name, params, reporter)
+            reporter.stop()
             
             await db.update_task(task_id, {
                 "status": TaskStatus.COMPLETED.value,
@@ -174,6 +296,7 @@ Be conversational and helpful. Always be aware of task context when responding."
                 "result": result,
                 "progress": 100
             })
+            self._bump_task_version()
             
             task = await db.get_task(task_id)
             await self._notify_user(
@@ -181,11 +304,14 @@ Be conversational and helpful. Always be aware of task context when responding."
             )
             
         except Exception as e:
+            reporter.stop()
             await db.update_task(task_id, {
                 "status": TaskStatus.FAILED.value,
                 "completed_at": datetime.now().isoformat(),
-                "error_message": str(e)
+                "error_message": str(e),
+                "progress": reporter.progress
             })
+            self._bump_task_version()
             
             task = await db.get_task(task_id)
             await self._notify_user(
@@ -193,10 +319,12 @@ Be conversational and helpful. Always be aware of task context when responding."
             )
         
         finally:
+            reporter.stop()
             if task_id in self.active_tasks:
                 del self.active_tasks[task_id]
             if task_id in self.task_states:
                 del self.task_states[task_id]
+                self._bump_active_version()
     
     async def _notify_user(self, message: str):
         await db.insert_chat_message(
@@ -211,15 +339,20 @@ Be conversational and helpful. Always be aware of task context when responding."
         if task_id in self.active_tasks:
             self.active_tasks[task_id].cancel()
             
-            await db.update_task(task_id, {
+            update_data = {
                 "status": TaskStatus.CANCELLED.value,
                 "completed_at": datetime.now().isoformat()
-            })
+            }
+            if task_id in self.task_states:
+                update_data["progress"] = self.task_states[task_id].progress
+            
+            await db.update_task(task_id, update_data)
             
             if task_id in self.task_states:
                 del self.task_states[task_id]
             if task_id in self.active_tasks:
                 del self.active_tasks[task_id]
+            self._bump_task_version()
     
     def get_active_task_states(self) -> List[Dict[str, Any]]:
         return [
@@ -234,9 +367,15 @@ Be conversational and helpful. Always be aware of task context when responding."
         ]
     
     async def shutdown(self):
+        if self.resume_task and not self.resume_task.done():
+            self.resume_task.cancel()
+        
         for task_id in list(self.active_tasks.keys()):
             self.active_tasks[task_id].cancel()
         
         self.active_tasks.clear()
-        self.task_states.clear()
-        self.conversation_context.clear()
\ No newline at end of file
+        if self.task_states:
+            self.task_states.clear()
+            self._bump_active_version()
+        self.conversation_context.clear()
+        self.closed = True
\ No newline at end of file
@@ -1,11 +1,14 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from agent_manager import agent_manager
 from models import ChatMessage, ChatResponse
 from database import db
 from config import SERVER_CONFIG, LLM_CONFIG
 from tools import get_available_tools
+from task_versions import task_versions
 import asyncio
+import orjson
 from pydantic import BaseModel
 import traceback
 from fastapi import FastAPI, HTTPException
@@ -26,8 +29,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+app.add_middleware(GZipMiddleware, minimum_size=SERVER_CONFIG["gzip_minimum_size"])
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+def etag_headers(etag: str) -> dict:
+    # Weak, because GZipMiddleware may send the same tag on a gzip and an
+    # identity body, and a strong validator must differ between the two.
+    return {"ETag": f"W/{etag}", "Cache-Control": "no-cache"}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
+
+def json_response(payload: dict, etag: str) -> Response:
+    return Response(
+        content=orjson.dumps(payload),
+        media_type="application/json",
+        headers=etag_headers(etag)
+    )
+
 @app.on_event("startup")
 async def startup():
     asyncio.create_task(periodic_cleanup())
@@ -74,17 +103,24 @@ async def process_chat(request: ProcessChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/tasks/{user_id}/{agent_id}")
-async def get_tasks(user_id: str, agent_id: str):
+async def get_tasks(user_id: str, agent_id: str, request: Request):
     try:
         agent = await agent_manager.get_or_create_agent(user_id, agent_id)
         
-        active_tasks = agent.get_active_task_states()
-        
-        all_tasks = await db.get_user_agent_tasks(user_id, agent_id)
+        # Every task transition bumps the version, so a matching tag means
+        # nothing has changed and the database does not need to be read.
+        etag = task_versions.etag(user_id, agent_id)
+        if etag_matches(request, etag):
+            return not_modified(etag)
         
-        return {
-            "active_tasks": active_tasks,
-            "all_tasks": [
+        # Progress and other in-memory changes leave the rows tag alone, so the
+        # task rows are only re-read when a row was actually written.
+        rows_tag = task_versions.rows_tag(user_id, agent_id)
+        if agent.all_tasks_cache and agent.all_tasks_cache[0] == rows_tag:
+            all_tasks = agent.all_tasks_cache[1]
+        else:
+            tasks = await db.get_user_agent_tasks(user_id, agent_id)
+            all_tasks = [
                 {
                     "id": task.id,
                     "task_name": task.task_name,
@@ -95,9 +131,14 @@ async def get_tasks(user_id: str, agent_id: str):
                     "created_at": task.created_at.isoformat(),
                     "completed_at": task.completed_at.isoformat() if task.completed_at else None
                 }
-                for task in all_tasks
+                for task in tasks
             ]
-        }
+            agent.all_tasks_cache = (rows_tag, all_tasks)
+        
+        return json_response({
+            "active_tasks": agent.get_active_task_states(),
+            "all_tasks": all_tasks
+        }, etag)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -115,10 +156,14 @@ async def cancel_task(user_id: str, agent_id: str, task_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/agents/active")
-async def get_active_agents():
-    return {
-        "active_agent_count": agent_manager.get_active_agent_count()
-    }
+async def get_active_agents(request: Request):
+    count = agent_manager.get_active_agent_count()
+    
+    etag = f'"agents-{count}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    return json_response({"active_agent_count": count}, etag)
 
 if __name__ == "__main__":
     import uvicorn
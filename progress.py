@@ -0,0 +1,53 @@
+import asyncio
+from typing import Callable, Optional
+from database import db
+
+# Progress callback handed to tools. Reports reach memory immediately via
+# on_update; database writes are coalesced to at most one per interval, always
+# with the latest value. The final status update carries the final progress,
+# so callers stop() the reporter before writing it.
+class ProgressReporter:
+    def __init__(self, task_id: str, on_update: Callable[[int], None], interval: float):
+        self.task_id = task_id
+        self.on_update = on_update
+        self.interval = interval
+        self.progress = 0
+        self.written = 0
+        self.last_write = 0.0
+        self.pending: Optional[asyncio.Task] = None
+    
+    def __call__(self, progress: int):
+        progress = max(0, min(100, int(progress)))
+        if progress == self.progress:
+            return
+        
+        self.progress = progress
+        self.on_update(progress)
+        
+        if self.pending is None:
+            loop = asyncio.get_running_loop()
+            delay = max(0.0, self.last_write + self.interval - loop.time())
+            self.pending = asyncio.create_task(self._write_after(delay))
+    
+    async def _write_after(self, delay: float):
+        await asyncio.sleep(delay)
+        self.pending = None
+        await self.flush()
+    
+    async def flush(self):
+        if self.progress == self.written:
+            return
+        
+        progress = self.progress
+        self.last_write = asyncio.get_running_loop().time()
+        
+        try:
+            await db.update_task(self.task_id, {"progress": progress})
+            self.written = progress
+        except Exception as e:
+            print(f"Error writing task progress: {e}")
+    
+    def stop(self):
+        if self.pending:
+            self.pending.cancel()
+            self.pending = None
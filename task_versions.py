@@ -0,0 +1,43 @@
+import uuid
+from typing import Dict, List
+
+class TaskVersions:
+    def __init__(self):
+        # key -> [prefix, rows_version, active_version]. rows_version tracks
+        # changes to task rows in the database; active_version tracks changes
+        # that only live in memory, such as progress. The prefix is random each
+        # time a key is (re)created, so a fresh counter after a restart or
+        # eviction never repeats a tag that was already handed out.
+        self.versions: Dict[str, List] = {}
+    
+    def _get_key(self, user_id: str, agent_id: str) -> str:
+        return f"{user_id}:{agent_id}"
+    
+    def _get_entry(self, user_id: str, agent_id: str) -> List:
+        key = self._get_key(user_id, agent_id)
+        if key not in self.versions:
+            self.versions[key] = [uuid.uuid4().hex[:12], 0, 0]
+        return self.versions[key]
+    
+    def bump(self, user_id: str, agent_id: str) -> int:
+        entry = self._get_entry(user_id, agent_id)
+        entry[1] += 1
+        return entry[1]
+    
+    def bump_active(self, user_id: str, agent_id: str) -> int:
+        entry = self._get_entry(user_id, agent_id)
+        entry[2] += 1
+        return entry[2]
+    
+    def rows_tag(self, user_id: str, agent_id: str) -> str:
+        prefix, rows_version, _ = self._get_entry(user_id, agent_id)
+        return f"{prefix}-{rows_version}"
+    
+    def etag(self, user_id: str, agent_id: str) -> str:
+        prefix, rows_version, active_version = self._get_entry(user_id, agent_id)
+        return f'"{prefix}-{rows_version}-{active_version}"'
+    
+    def forget(self, user_id: str, agent_id: str):
+        self.versions.pop(self._get_key(user_id, agent_id), None)
+
+task_versions = TaskVersions()
@@ -1,6 +1,8 @@
 import asyncio
 import math
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional
+
+TOOL_DURATION = 60
 
 AVAILABLE_TOOLS = [
     {
@@ -79,8 +81,18 @@ AVAILABLE_TOOLS = [
     }
 ]
 
-async def execute_tool(tool_name: str, params: Dict[str, Any]) -> Dict[str, Any]:
-    await asyncio.sleep(60)
+async def _simulate_work(report_progress: Optional[Callable[[int], None]]):
+    for elapsed in range(TOOL_DURATION):
+        if report_progress:
+            report_progress(elapsed * 100 // TOOL_DURATION)
+        await asyncio.sleep(1)
+
+async def execute_tool(
+    tool_name: str,
+    params: Dict[str, Any],
+    report_progress: Optional[Callable[[int], None]] = None
+) -> Dict[str, Any]:
+    await _simulate_work(report_progress)
     
     if tool_name == "add_numbers":
         result = params["a"] + params["b"]